@@ -1,6 +1,6 @@
 import asyncio
 from devops_copilot.core.engine import WorkflowEngine
-from devops_copilot.tools.standard_tools import web_search, calculator, idempotent_write
+from devops_copilot.tools.standard_tools import web_search, calculator, idempotent_write, close_http_client
 from devops_copilot.utils.logger import logger
 
 async def main():
@@ -26,5 +26,8 @@ async def main():
     calc_result = await engine.run("Calculate (10 + 5) * 2", session_id="sec-test")
     print(f"Calculation Result: {calc_result}")
 
+    await engine.drain()
+    await close_http_client()
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -2,16 +2,34 @@
 base.py — Base Agent + Session State
 """
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 from devops_copilot.utils.logger import logger
 
+# Max history entries kept per session; bounds persisted state and prompt size.
+MAX_HISTORY = 32
+
 
 class AgentState(BaseModel):
     """Represents the state of an agent during a session."""
     session_id: str
     history: List[Dict[str, Any]] = Field(default_factory=list)
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    # (window, rendered text) of the last conversation render; not persisted
+    _conversation_cache: Optional[Tuple[int, str]] = PrivateAttr(default=None)
+
+    def recent_conversation(self, window: int) -> str:
+        """Render the last `window` history entries as 'ROLE: content' lines.
+        Cached until the next history append."""
+        cached = self._conversation_cache
+        if cached is not None and cached[0] == window:
+            return cached[1]
+        text = "\n".join(
+            f"{m['role'].upper()}: {m['content']}"
+            for m in self.history[-window:]
+        )
+        self._conversation_cache = (window, text)
+        return text
 
 
 class BaseAgent(ABC):
@@ -29,4 +47,7 @@ class BaseAgent(ABC):
     def _log_interaction(self, state: AgentState, role: str, content: str):
         preview = content[:120] if len(content) > 120 else content
         state.history.append({"role": role, "content": content})
+        if len(state.history) > MAX_HISTORY:
+            del state.history[:-MAX_HISTORY]
+        state._conversation_cache = None
         logger.info(f"[{self.name}] {role}: {preview}")
@@ -3,14 +3,25 @@ workflow_agents.py — Multi-Provider Planner & Executor
 Supports: Gemini (google-genai) | Groq (llama-3.3-70b-versatile)
 Set LLM_PROVIDER=gemini|groq in your .env
 """
+import asyncio
+import functools
+import hashlib
+import importlib
 import json
 import os
 import re
+import threading
+import time
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional
+import httpx
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from devops_copilot.agents.base import BaseAgent, AgentState
+from devops_copilot.core.observability import PLANNER_PARSE_RECOVERY
 from devops_copilot.tools.registry import registry
 from devops_copilot.utils.logger import logger
+from devops_copilot.utils import serialization
 
 
 # ── Data models ────────────────────────────────────────────────────────────────
@@ -22,7 +33,11 @@ class PlanStep(BaseModel):
 
 
 class Plan(BaseModel):
-    steps: list[PlanStep]
+    steps: list[PlanStep] = Field(default_factory=list)
+
+
+# Compiled once; parses and validates LLM output in a single pydantic-core pass.
+_plan_adapter = TypeAdapter(Plan)
 
 
 # ── Shared ReAct prompt ────────────────────────────────────────────────────────
@@ -51,13 +66,42 @@ Available tools:
 {tools}
 """
 
+# Separates the byte-stable prefix (system prompt + tools) from the per-turn
+# suffix. Providers with prefix caching only discount an identical prefix.
+_DYNAMIC_DELIMITER = "\n---DYNAMIC---\n"
+
+
+@functools.lru_cache(maxsize=1)
+def _render_system_prompt(registry_version: int) -> str:
+    """Render the static prompt prefix; re-rendered only when the registry changes."""
+    tools_json = serialization.dumps(registry.list_tools(), indent=True, sort_keys=True)
+    return _PLANNER_SYSTEM.format(tools=tools_json)
+
 
 # ── LLM Provider backends ──────────────────────────────────────────────────────
 
 class _LLMBackend(ABC):
-    """Abstract LLM backend. Implement `complete(prompt) -> str`."""
+    """
+    Abstract LLM backend. Implement `async complete(prompt) -> str`; override
+    `stream(prompt)` to yield text chunks as they arrive.
+    """
     @abstractmethod
-    def complete(self, prompt: str) -> str: ...
+    async def complete(self, prompt: str) -> str: ...
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        yield await self.complete(prompt)
+
+
+# Explicit Gemini context caches, keyed by (model, sha256(prefix)) → (name, expires_at).
+# Module-level so they outlive individual backend instances.
+_GEMINI_PREFIX_CACHES: dict[tuple[str, str], tuple[str, float]] = {}
+# Prefixes the API refused to cache (e.g. below the minimum token count)
+_GEMINI_UNCACHEABLE: set[tuple[str, str]] = set()
+# Transient creation failures: don't retry before this time
+_GEMINI_CACHE_RETRY_AT: dict[tuple[str, str], float] = {}
+# In-flight creations, so concurrent first requests share one cache
+_GEMINI_CACHE_CREATING: dict[tuple[str, str], asyncio.Task] = {}
+_GEMINI_CACHE_RETRY_SECONDS = 30.0
 
 
 class _GeminiBackend(_LLMBackend):
@@ -69,46 +113,387 @@ class _GeminiBackend(_LLMBackend):
         self._client = genai.Client(api_key=api_key)
         self._model = model
 
-    def complete(self, prompt: str) -> str:
-        response = self._client.models.generate_content(
-            model=self._model, contents=prompt
+    async def _request(self, prompt: str) -> tuple[str, Any]:
+        """Split off the cached prefix if possible; returns (contents, config)."""
+        prefix, sep, suffix = prompt.partition(_DYNAMIC_DELIMITER)
+        cache_name = await self._prefix_cache(prefix) if sep else None
+        if cache_name:
+            from google.genai import types  # lazy import
+            return suffix, types.GenerateContentConfig(cached_content=cache_name)
+        return prompt, None
+
+    async def complete(self, prompt: str) -> str:
+        contents, config = await self._request(prompt)
+        response = await self._client.aio.models.generate_content(
+            model=self._model, contents=contents, config=config
         )
         return response.text.strip()
 
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        contents, config = await self._request(prompt)
+        async for chunk in await self._client.aio.models.generate_content_stream(
+            model=self._model, contents=contents, config=config
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    async def _prefix_cache(self, prefix: str) -> Optional[str]:
+        """
+        Return the name of an explicit context cache holding `prefix`, creating
+        it on first use (once, however many requests are waiting). Returns None
+        when the API refuses (e.g. the prefix is below the model's minimum
+        cacheable size) or after a transient failure, until a retry is due;
+        implicit caching still applies because the prefix is byte-stable.
+        """
+        key = (self._model, hashlib.sha256(prefix.encode()).hexdigest())
+        if key in _GEMINI_UNCACHEABLE:
+            return None
+        now = time.time()
+        entry = _GEMINI_PREFIX_CACHES.get(key)
+        if entry and now < entry[1]:
+            return entry[0]
+        if now < _GEMINI_CACHE_RETRY_AT.get(key, 0.0):
+            return None
+
+        loop = asyncio.get_running_loop()
+        task = _GEMINI_CACHE_CREATING.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._create_prefix_cache(key, prefix))
+            _GEMINI_CACHE_CREATING[key] = task
+            task.add_done_callback(
+                lambda t: _GEMINI_CACHE_CREATING.pop(key, None)
+                if _GEMINI_CACHE_CREATING.get(key) is t else None
+            )
+        # Shielded: one cancelled caller must not abort the shared creation
+        return await asyncio.shield(task)
+
+    async def _create_prefix_cache(self, key: tuple[str, str], prefix: str) -> Optional[str]:
+        from google.genai import errors, types  # lazy import
+        ttl = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "300"))
+        try:
+            cache = await self._client.aio.caches.create(
+                model=self._model,
+                config=types.CreateCachedContentConfig(contents=[prefix], ttl=f"{ttl}s"),
+            )
+        except errors.ClientError as e:
+            if e.code == 400:
+                # Refused for this content (e.g. too few tokens); won't change
+                logger.info(f"Gemini explicit cache refused, relying on implicit caching: {e}")
+                _GEMINI_UNCACHEABLE.add(key)
+            else:
+                logger.warning(f"Gemini explicit cache creation failed, retrying later: {e}")
+                _GEMINI_CACHE_RETRY_AT[key] = time.time() + _GEMINI_CACHE_RETRY_SECONDS
+            return None
+        except Exception as e:
+            logger.warning(f"Gemini explicit cache creation failed, retrying later: {e}")
+            _GEMINI_CACHE_RETRY_AT[key] = time.time() + _GEMINI_CACHE_RETRY_SECONDS
+            return None
+        _GEMINI_CACHE_RETRY_AT.pop(key, None)
+        # Renew a little early so an in-flight request never references an expired cache.
+        _GEMINI_PREFIX_CACHES[key] = (cache.name, time.time() + ttl * 0.9)
+        return cache.name
+
 
 class _GroqBackend(_LLMBackend):
     def __init__(self, model: str):
-        from groq import Groq  # lazy import
+        from groq import AsyncGroq  # lazy import
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise EnvironmentError("GROQ_API_KEY not set.")
-        self._client = Groq(api_key=api_key)
+        # Explicit pooled client so keep-alive sockets survive between turns
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16,
+                                keepalive_expiry=60)
+        )
+        self._client = AsyncGroq(api_key=api_key, http_client=http_client)
         self._model = model
 
-    def complete(self, prompt: str) -> str:
-        response = self._client.chat.completions.create(
+    async def complete(self, prompt: str) -> str:
+        response = await self._client.chat.completions.create(
             model=self._model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
         )
         return response.choices[0].message.content.strip()
 
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self._client.chat.completions.create(
+            model=self._model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            stream=True,
+        )
+        try:
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            # Closing early aborts the HTTP response instead of draining it
+            await response.close()
+
+
+def _preload_providers():
+    """Import provider SDKs ahead of the first request; populates sys.modules
+    so the lazy imports in the backends are dictionary lookups."""
+    for module in ("google.genai", "groq"):
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+# Overlap the SDK import cost (hundreds of ms) with process startup.
+threading.Thread(target=_preload_providers, name="llm-preload", daemon=True).start()
+
 
 def _build_backend(provider: str) -> _LLMBackend:
-    """Factory: builds the correct LLM backend based on provider name."""
+    """Factory: returns the shared LLM backend for the provider's configured model."""
     provider = provider.lower()
     if provider == "gemini":
-        model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-        logger.info(f"Using Gemini backend: {model}")
-        return _GeminiBackend(model)
+        return _cached_backend(provider, os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
     elif provider == "groq":
-        model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        logger.info(f"Using Groq backend: {model}")
-        return _GroqBackend(model)
+        return _cached_backend(provider, os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
     else:
         raise ValueError(f"Unknown LLM_PROVIDER: '{provider}'. Use gemini or groq.")
 
 
+# (provider, model) → (event loop, backend); see _cached_backend
+_BACKENDS: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, _LLMBackend]] = {}
+
+
+def _cached_backend(provider: str, model: str) -> _LLMBackend:
+    """
+    Built once per (provider, model) per event loop, so SDK clients keep their
+    connection pools across concurrent sessions. Pooled connections are bound
+    to the loop that opened them, so a new loop (e.g. a later asyncio.run) gets
+    a fresh backend. Construction errors (e.g. missing API key) are not cached.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _BACKENDS.get((provider, model))
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    if provider == "gemini":
+        logger.info(f"Using Gemini backend: {model}")
+        backend: _LLMBackend = _GeminiBackend(model)
+    else:
+        logger.info(f"Using Groq backend: {model}")
+        backend = _GroqBackend(model)
+    _BACKENDS[(provider, model)] = (loop, backend)
+    return backend
+
+
+# ── Planner response cache ─────────────────────────────────────────────────────
+
+# Session metadata flags that change what the planner should do next; a cached
+# plan from before the flag flipped must not be replayed.
+_VOLATILE_METADATA = ("human_approved", "rejected")
+
+
+class PlanCache:
+    """
+    Two-tier cache for raw planner responses.
+
+    Tier 1: exact match on sha256(full prompt), bounded LRU.
+    Tier 2 (optional): semantic match against a Chroma collection, keyed on the
+    dynamic part of the prompt (history + request). The collection must use
+    cosine space so that distance = 1 - similarity. Chroma embeds on every
+    query/upsert, so this tier runs in a worker thread. A semantic hit is only
+    replayed if its concrete targets match the current request (see _grounded).
+    Entries older than `ttl_seconds` are ignored by both tiers.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0,
+                 semantic_collection: Optional[Any] = None,
+                 similarity_threshold: float = 0.92):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._exact: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._semantic = semantic_collection
+
+    @staticmethod
+    def _key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    @staticmethod
+    def _grounded(response: str, request: str) -> bool:
+        """
+        True if every identifier-like string argument in the cached plan (no
+        whitespace: service names, filenames, channels) appears in `request`.
+        Requests differing only in the service name embed almost identically,
+        so without this a hit could replay a step against the wrong target.
+        Free-text arguments (reasons, messages) aren't checked.
+        """
+        try:
+            steps = serialization.loads(response).get("steps") or []
+        except Exception:
+            return False
+        haystack = request.lower()
+        for step in steps:
+            arguments = step.get("arguments") if isinstance(step, dict) else None
+            for value in (arguments or {}).values():
+                if (isinstance(value, str) and value and not any(c.isspace() for c in value)
+                        and value.lower() not in haystack):
+                    return False
+        return True
+
+    async def get(self, prompt: str, semantic_key: Optional[str] = None,
+                  request: Optional[str] = None) -> Optional[str]:
+        """
+        Return a cached response for `prompt`, or None on miss. Semantic hits
+        must also be grounded in `request` (defaults to `semantic_key`).
+        """
+        key = self._key(prompt)
+        now = time.time()
+        entry = self._exact.get(key)
+        if entry is not None:
+            created_at, response = entry
+            if now - created_at < self.ttl_seconds:
+                self._exact.move_to_end(key)
+                logger.info("[PlanCache] exact hit")
+                return response
+            del self._exact[key]
+
+        if self._semantic is None or not semantic_key:
+            return None
+        try:
+            res = await asyncio.to_thread(self._semantic_query, semantic_key, now)
+        except Exception as e:
+            logger.warning(f"[PlanCache] semantic lookup failed: {e}")
+            return None
+        if res is None:
+            return None
+        distances = (res.get("distances") or [[]])[0]
+        metadatas = (res.get("metadatas") or [[]])[0]
+        if distances and 1.0 - distances[0] >= self.similarity_threshold:
+            response = metadatas[0]["response"]
+            if not self._grounded(response, request or semantic_key):
+                logger.info("[PlanCache] semantic match rejected: arguments don't match the request")
+                return None
+            logger.info(f"[PlanCache] semantic hit (similarity={1.0 - distances[0]:.3f})")
+            return response
+        return None
+
+    def _semantic_query(self, semantic_key: str, now: float) -> Optional[dict]:
+        if self._semantic.count() == 0:
+            return None
+        return self._semantic.query(
+            query_texts=[semantic_key],
+            n_results=1,
+            where={"created_at": {"$gte": now - self.ttl_seconds}},
+        )
+
+    def _semantic_store(self, key: str, semantic_key: str, response: str, now: float):
+        self._semantic.delete(where={"created_at": {"$lt": now - self.ttl_seconds}})
+        self._semantic.upsert(
+            ids=[key],
+            documents=[semantic_key],
+            metadatas=[{"response": response, "created_at": now}],
+        )
+
+    async def put(self, prompt: str, response: str, semantic_key: Optional[str] = None):
+        """Store `response` for `prompt` in both tiers."""
+        key = self._key(prompt)
+        now = time.time()
+        self._exact[key] = (now, response)
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if self._semantic is None or not semantic_key:
+            return
+        try:
+            await asyncio.to_thread(self._semantic_store, key, semantic_key, response, now)
+        except Exception as e:
+            logger.warning(f"[PlanCache] semantic store failed: {e}")
+
+
+class _StepStreamParser:
+    """
+    Incremental scanner over streamed planner output. Tracks bracket depth,
+    ignoring brackets inside strings, and returns the text of each object in
+    the root object's array (i.e. each `steps[i]`) as soon as it closes.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._start: Optional[int] = None
+
+    def feed(self, chunk: str) -> list[str]:
+        """Consume a chunk; return any step objects completed within it."""
+        completed = []
+        offset = len(self.text)
+        self.text += chunk
+        for i, ch in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._stack == ["{", "["]:
+                    self._start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._start is not None and self._stack == ["{", "["]:
+                    completed.append(self.text[self._start:i + 1])
+                    self._start = None
+        return completed
+
+
+def _strip_fences(raw: str) -> str:
+    """Strip markdown fences if the model wraps output with ```json...```."""
+    return raw.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
+
+# ── Malformed-output recovery ──────────────────────────────────────────────────
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _recover_json(raw: str) -> tuple[Optional[Any], str]:
+    """
+    Best-effort parse of a planner response that failed strict JSON parsing,
+    so a minor format slip doesn't cost another LLM round-trip.
+
+    Paths, cheapest first:
+      1. extract   — outermost {...} block (drops prose around the JSON)
+      2. trailing_comma — same block with trailing commas removed
+      3. json_repair — optional `json-repair` package, if installed
+    Returns (parsed, path), or (None, "failed") if nothing yields an object.
+    """
+    match = _JSON_OBJECT.search(raw)
+    if match:
+        block = match.group(0)
+        try:
+            return json.loads(block), "extract"
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", block)), "trailing_comma"
+        except json.JSONDecodeError:
+            pass
+    try:
+        import json_repair  # optional dependency
+        repaired = json_repair.loads(raw)
+        if isinstance(repaired, dict):
+            return repaired, "json_repair"
+    except Exception:
+        pass
+    return None, "failed"
+
+
 def _mock_plan() -> Plan:
     """Fallback demo plan when no API key is configured."""
     return Plan(steps=[PlanStep(
@@ -124,9 +509,31 @@ class PlannerAgent(BaseAgent):
     """
     Provider-agnostic Planner Agent.
     Set LLM_PROVIDER=gemini|groq in your .env to choose backend.
+    Responses are memoized in a PlanCache to skip repeat LLM round-trips.
     """
-    def __init__(self):
+    def __init__(self, cache: Optional[PlanCache] = None):
         super().__init__(name="Planner", role="Strategic Planning")
+        self.cache = cache or PlanCache()
+
+    @staticmethod
+    async def _stream_first_step(backend: _LLMBackend, prompt: str) -> str:
+        """
+        Stream the completion and stop reading once the first step object
+        closes — the prompt asks for exactly one step per response, so the
+        engine can start executing while the model would still be emitting
+        the closing tokens. Returns JSON text for the normal parse path.
+        """
+        parser = _StepStreamParser()
+        chunks = backend.stream(prompt)
+        try:
+            async for chunk in chunks:
+                steps = parser.feed(chunk)
+                if steps:
+                    return '{"steps": [' + steps[0] + ']}'
+        finally:
+            await chunks.aclose()
+        # No step closed early (empty plan or malformed output): parse it all
+        return _strip_fences(parser.text)
 
     async def chat(self, message: str, state: AgentState) -> Plan:
         provider = os.getenv("LLM_PROVIDER", "gemini")
@@ -139,30 +546,54 @@ class PlannerAgent(BaseAgent):
             logger.error(str(e))
             return _mock_plan()
 
-        tools_info = registry.list_tools()
-        system_prompt = _PLANNER_SYSTEM.format(tools=json.dumps(tools_info, indent=2))
+        system_prompt = _render_system_prompt(registry.version)
 
-        conversation = "\n".join(
-            f"{m['role'].upper()}: {m['content']}"
-            for m in state.history[-6:]
-        )
-        full_prompt = f"{system_prompt}\n\n{conversation}\nUSER: {message}"
+        conversation = state.recent_conversation(window=6)
+        dynamic = f"{conversation}\nUSER: {message}"
+        full_prompt = f"{system_prompt}{_DYNAMIC_DELIMITER}{dynamic}"
 
-        try:
-            raw = backend.complete(full_prompt)
-            # Strip markdown fences if model wraps with ```json...```
-            raw = re.sub(r"^```(?:json)?\n?", "", raw)
-            raw = re.sub(r"\n?```$", "", raw)
+        use_cache = not any(state.metadata.get(k) for k in _VOLATILE_METADATA)
+        cached = (await self.cache.get(full_prompt, semantic_key=dynamic, request=message)
+                  if use_cache else None)
 
-            parsed = json.loads(raw)
-            steps = [PlanStep(**s) for s in parsed.get("steps", [])]
+        try:
+            if cached is not None:
+                raw = cached
+            elif os.getenv("LLM_STREAMING", "true").lower() == "true":
+                raw = await self._stream_first_step(backend, full_prompt)
+            else:
+                raw = _strip_fences(await backend.complete(full_prompt))
+
+            # Cheap pre-filter: a response without any step can only become an
+            # empty plan, so skip JSON parsing and recovery entirely. Steps
+            # naming unknown tools are parsed as usual; the executor reports
+            # them as "not found" so the model can correct itself.
+            if "tool_name" not in raw:
+                self._log_interaction(state, "assistant", raw)
+                logger.info(f"[{provider.upper()}] Planner proposed no steps.")
+                return Plan(steps=[])
+
+            try:
+                plan = _plan_adapter.validate_json(raw)
+            except ValidationError as e:
+                if e.errors()[0]["type"] != "json_invalid":
+                    raise
+                parsed, path = _recover_json(raw)
+                PLANNER_PARSE_RECOVERY.labels(path=path).inc()
+                if parsed is None:
+                    logger.error(f"LLM returned non-JSON: {raw[:200]} — {e}")
+                    return Plan(steps=[])
+                logger.warning(f"Recovered malformed planner JSON via '{path}'")
+                plan = _plan_adapter.validate_python(parsed)
+                raw = serialization.dumps(parsed)
+
+            steps = plan.steps
+            if cached is None and use_cache:
+                await self.cache.put(full_prompt, raw, semantic_key=dynamic)
             self._log_interaction(state, "assistant", raw)
             logger.info(f"[{provider.upper()}] Planner proposed {len(steps)} step(s).")
-            return Plan(steps=steps)
+            return plan
 
-        except json.JSONDecodeError as e:
-            logger.error(f"LLM returned non-JSON: {raw[:200]} — {e}")
-            return Plan(steps=[])
         except Exception as e:
             logger.error(f"LLM backend error: {e}")
             return Plan(steps=[])
@@ -181,8 +612,12 @@ class ExecutorAgent(BaseAgent):
             self._log_interaction(state, "tool_error", msg)
             return msg
         try:
-            result = tool.execute(**step.arguments)
-            result_str = json.dumps(result) if isinstance(result, dict) else str(result)
+            if tool.is_async:
+                result = await tool.execute(**step.arguments)
+            else:
+                # Sync tools do blocking I/O; keep them off the event loop
+                result = await asyncio.to_thread(tool.execute, **step.arguments)
+            result_str = serialization.dumps(result) if isinstance(result, dict) else str(result)
             self._log_interaction(state, "tool_result", result_str)
             return result_str
         except Exception as e:
@@ -11,11 +11,13 @@ Endpoints:
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 from devops_copilot.core.persistence import PersistenceLayer
-from devops_copilot.core.observability import FALSE_POSITIVE_TOTAL
+from devops_copilot.core.observability import FALSE_POSITIVE_TOTAL, SESSION_CACHE_HITS
 from devops_copilot.utils.logger import logger
+import copy
 import os
+import time
 
 app = FastAPI(
     title="AgentNexus DevOps Copilot API",
@@ -23,9 +25,69 @@ app = FastAPI(
     version="1.0.0",
 )
 
+class CachedPersistence:
+    """
+    Read-through, write-through cache in front of PersistenceLayer.
+
+    UI polling hits GET /sessions/{id} repeatedly; reads within `ttl` seconds
+    of the last load/write are served from memory. The engine may write the
+    same DB from another process, so the TTL bounds how stale a read can be.
+    """
+
+    def __init__(self, backend: PersistenceLayer, ttl: float = 2.0):
+        self._backend = backend
+        self.ttl = ttl
+        self._cache: Dict[str, tuple[float, Dict[str, Any]]] = {}
+
+    async def setup(self):
+        await self._backend.setup()
+
+    async def close(self):
+        await self._backend.close()
+
+    async def list_sessions(self):
+        return await self._backend.list_sessions()
+
+    async def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(session_id)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            SESSION_CACHE_HITS.inc()
+            return copy.deepcopy(entry[1])
+        state = await self._backend.load_session(session_id)
+        if state is None:
+            self._cache.pop(session_id, None)
+            return None
+        self._cache[session_id] = (time.monotonic(), copy.deepcopy(state))
+        return state
+
+    async def save_session(self, session_id: str, state: Dict[str, Any]):
+        self._cache[session_id] = (time.monotonic(), copy.deepcopy(state))
+        await self._backend.save_session(session_id, state)
+
+    async def set_approved(self, session_id: str):
+        await self._set_flags(self._backend.set_approved, session_id, human_approved=True)
+
+    async def set_rejected(self, session_id: str):
+        await self._set_flags(self._backend.set_rejected, session_id,
+                              human_approved=False, rejected=True)
+
+    async def _set_flags(self, update, session_id: str, **flags):
+        """Run an in-SQL flag update, then mirror it onto any cached copy."""
+        try:
+            await update(session_id)
+        except KeyError:
+            self._cache.pop(session_id, None)
+            raise
+        entry = self._cache.get(session_id)
+        if entry:
+            state = entry[1]
+            state["metadata"] = {**(state.get("metadata") or {}), **flags}
+            self._cache[session_id] = (time.monotonic(), state)
+
+
 # Shared persistence layer (same DB as the engine)
 _db_path = os.getenv("DATABASE_URL", "agentnexus_state.db").replace("sqlite:///./", "")
-persistence = PersistenceLayer(db_path=_db_path)
+persistence = CachedPersistence(PersistenceLayer(db_path=_db_path))
 
 
 @app.on_event("startup")
@@ -34,6 +96,11 @@ async def _startup():
     logger.info("API server started.")
 
 
+@app.on_event("shutdown")
+async def _shutdown():
+    await persistence.close()
+
+
 # ── Request/Response models ────────────────────────────────────────────────────
 
 class ApproveRequest(BaseModel):
@@ -84,17 +151,15 @@ async def reject_action(session_id: str, body: RejectRequest = RejectRequest()):
     """
     Reject a pending action and track it as a false positive in Prometheus.
     """
-    state = await persistence.load_session(session_id)
-    if state is None:
-        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found.")
+    # Mark rejected so the engine can clean up or try a different plan. Patched
+    # in SQL, so history the engine wrote since our last (cached) read survives.
+    try:
+        await persistence.set_rejected(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
     # Record false positive metric
     FALSE_POSITIVE_TOTAL.inc()
 
-    # Mark rejected so the engine can clean up or try a different plan
-    state.setdefault("metadata", {})["human_approved"] = False
-    state["metadata"]["rejected"] = True
-    await persistence.save_session(session_id, state)
-
     logger.warning(f"Rejected session {session_id}: {body.reason}")
     return {"session_id": session_id, "status": "rejected", "reason": body.reason}
@@ -2,8 +2,35 @@
 config.py — Centralized threshold and tuning configuration.
 All values can be overridden via environment variables or per-service overrides.
 """
+import functools
 import os
-from typing import Dict, Optional
+import re
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+
+_UNSET = object()
+
+
+class _EnvSetting:
+    """
+    Class attribute resolved from the environment on first access, then cached.
+    Deferring the read means importing this module before load_dotenv() still
+    picks up values from .env.
+    """
+
+    def __init__(self, env_var: str, default: str, cast: Callable[[str], Any]):
+        self.env_var = env_var
+        self.default = default
+        self.cast = cast
+        self._value: Any = _UNSET
+
+    def __get__(self, obj, owner=None):
+        if self._value is _UNSET:
+            self._value = self.cast(os.getenv(self.env_var, self.default))
+        return self._value
+
+    def reset(self):
+        self._value = _UNSET
 
 
 class ThresholdConfig:
@@ -17,45 +44,71 @@ class ThresholdConfig:
     Example:
         THRESHOLD_PAYMENT_GATEWAY_ERROR_RATE=0.20
         WINDOW_PAYMENT_GATEWAY_SECONDS=120
+
+    Known services: any service with one of the overrides above, plus those
+    listed in KNOWN_SERVICES (comma-separated, e.g. "payment-gateway,auth").
+    Only known services get their own `service` label on Prometheus metrics,
+    always under one canonical name: the spelling in KNOWN_SERVICES, else the
+    env-key form (e.g. PAYMENT_GATEWAY). Spelling variants map to that name, and
+    everything else is reported as service="other", so label cardinality stays
+    bounded. To break out a new service, add it to KNOWN_SERVICES.
     """
 
     # === Global defaults ======================================================
     # Error rate above which an anomaly is flagged (0.0 – 1.0)
-    DEFAULT_ERROR_RATE_THRESHOLD: float = float(
-        os.getenv("ANOMALY_ERROR_RATE_THRESHOLD", "0.10")
+    DEFAULT_ERROR_RATE_THRESHOLD: float = _EnvSetting(
+        "ANOMALY_ERROR_RATE_THRESHOLD", "0.10", float
     )
     # Rolling window for error rate calculation (seconds)
-    DEFAULT_WINDOW_SECONDS: int = int(
-        os.getenv("ANOMALY_WINDOW_SECONDS", "300")
+    DEFAULT_WINDOW_SECONDS: int = _EnvSetting(
+        "ANOMALY_WINDOW_SECONDS", "300", int
     )
     # Minimum total log volume before anomaly detection fires (avoids cold-start noise)
-    MIN_LOG_VOLUME: int = int(
-        os.getenv("ANOMALY_MIN_LOG_VOLUME", "5")
+    MIN_LOG_VOLUME: int = _EnvSetting(
+        "ANOMALY_MIN_LOG_VOLUME", "5", int
     )
 
     # === MTTD ================================================================
     # Maximum MTTD to record in Prometheus (seconds); spikes > this are clamped
-    MTTD_CEILING_SECONDS: float = float(
-        os.getenv("MTTD_CEILING_SECONDS", "3600")
+    MTTD_CEILING_SECONDS: float = _EnvSetting(
+        "MTTD_CEILING_SECONDS", "3600", float
     )
 
     # === Remediation =========================================================
     # Number of consecutive anomaly checks before auto-escalation is considered
-    ESCALATION_THRESHOLD: int = int(
-        os.getenv("ESCALATION_THRESHOLD_COUNT", "3")
+    ESCALATION_THRESHOLD: int = _EnvSetting(
+        "ESCALATION_THRESHOLD_COUNT", "3", int
     )
 
     @classmethod
     def error_rate_threshold(cls, service: str) -> float:
         """Return error rate threshold for a specific service, with env override."""
-        key = f"THRESHOLD_{_env_key(service)}_ERROR_RATE"
-        return float(os.getenv(key, str(cls.DEFAULT_ERROR_RATE_THRESHOLD)))
+        return _error_rate_threshold(service)
 
     @classmethod
     def window_seconds(cls, service: str) -> int:
         """Return the lookback window for a specific service."""
-        key = f"WINDOW_{_env_key(service)}_SECONDS"
-        return int(os.getenv(key, str(cls.DEFAULT_WINDOW_SECONDS)))
+        return _window_seconds(service)
+
+    @classmethod
+    def services(cls) -> FrozenSet[str]:
+        """Canonical names of the known services."""
+        return frozenset(_known_services().values())
+
+    @classmethod
+    def service_label(cls, service: str) -> str:
+        """Metric label for `service`: its canonical name if known, else "other"."""
+        return _known_services().get(_env_key(service), "other")
+
+    @classmethod
+    def invalidate(cls):
+        """Drop cached values so the next lookup re-reads the environment."""
+        for attr in vars(cls).values():
+            if isinstance(attr, _EnvSetting):
+                attr.reset()
+        _error_rate_threshold.cache_clear()
+        _window_seconds.cache_clear()
+        _known_services.cache_clear()
 
     @classmethod
     def summary(cls) -> Dict:
@@ -66,6 +119,7 @@ class ThresholdConfig:
             "min_log_volume": cls.MIN_LOG_VOLUME,
             "mttd_ceiling_seconds": cls.MTTD_CEILING_SECONDS,
             "escalation_threshold": cls.ESCALATION_THRESHOLD,
+            "known_services": sorted(cls.services()),
         }
 
 
@@ -74,5 +128,39 @@ def _env_key(service: str) -> str:
     return service.upper().replace("-", "_").replace(".", "_")
 
 
+# Env is effectively immutable at runtime, so per-service lookups are memoized.
+# ThresholdConfig.invalidate() clears them.
+
+@functools.lru_cache(maxsize=None)
+def _error_rate_threshold(service: str) -> float:
+    key = f"THRESHOLD_{_env_key(service)}_ERROR_RATE"
+    return float(os.getenv(key, str(ThresholdConfig.DEFAULT_ERROR_RATE_THRESHOLD)))
+
+
+@functools.lru_cache(maxsize=None)
+def _window_seconds(service: str) -> int:
+    key = f"WINDOW_{_env_key(service)}_SECONDS"
+    return int(os.getenv(key, str(ThresholdConfig.DEFAULT_WINDOW_SECONDS)))
+
+
+_OVERRIDE_KEY = re.compile(r"^(?:THRESHOLD_(\w+)_ERROR_RATE|WINDOW_(\w+)_SECONDS)$")
+
+
+@functools.lru_cache(maxsize=1)
+def _known_services() -> Dict[str, str]:
+    """Env key → canonical service name."""
+    known: Dict[str, str] = {}
+    for key in os.environ:
+        match = _OVERRIDE_KEY.match(key)
+        if match:
+            name = match.group(1) or match.group(2)
+            known[name] = name
+    # Listed names take precedence as the canonical spelling
+    for name in os.getenv("KNOWN_SERVICES", "").split(","):
+        if name.strip():
+            known[_env_key(name.strip())] = name.strip()
+    return known
+
+
 # Singleton instance used by tools
 thresholds = ThresholdConfig()
@@ -2,16 +2,18 @@
 engine.py — WorkflowEngine with async persistence, approval gate, and telemetry.
 """
 from typing import Optional
-import json
+import asyncio
+import os
 import uuid
 
-from devops_copilot.agents.workflow_agents import PlannerAgent, ExecutorAgent
-from devops_copilot.agents.base import AgentState
+from devops_copilot.agents.workflow_agents import PlannerAgent, ExecutorAgent, PlanCache
+from devops_copilot.agents.base import AgentState, MAX_HISTORY
 from devops_copilot.core.memory import MemorySystem
 from devops_copilot.core.persistence import PersistenceLayer
 from devops_copilot.core.observability import start_metrics_server
 from devops_copilot.core.telemetry import tracer
 from devops_copilot.utils.logger import logger
+from devops_copilot.utils import serialization
 
 
 class WorkflowEngine:
@@ -19,9 +21,11 @@ class WorkflowEngine:
 
     def __init__(self, db_path: str = "agentnexus_state.db",
                  memory_dir: str = "./chroma_db", run_metrics: bool = True):
-        self.planner = PlannerAgent()
-        self.executor = ExecutorAgent()
         self.memory = MemorySystem(persist_directory=memory_dir)
+        self.planner = PlannerAgent(cache=self._build_plan_cache())
+        self.executor = ExecutorAgent()
+        # Background writes not on the response path; see drain()
+        self._pending: set[asyncio.Task] = set()
         self.persistence = PersistenceLayer(db_path=db_path)
 
         if run_metrics:
@@ -30,6 +34,61 @@ class WorkflowEngine:
             except Exception as e:
                 logger.warning(f"Could not start metrics server: {e}")
 
+    def _build_plan_cache(self) -> PlanCache:
+        """Exact-match plan cache, plus the Chroma-backed semantic tier when
+        PLANNER_SEMANTIC_CACHE=true."""
+        ttl = float(os.getenv("PLANNER_CACHE_TTL_SECONDS", "300"))
+        semantic = None
+        if os.getenv("PLANNER_SEMANTIC_CACHE", "false").lower() == "true":
+            semantic = self.memory.get_collection(
+                "planner_cache", metadata={"hnsw:space": "cosine"}
+            )
+        return PlanCache(
+            ttl_seconds=ttl,
+            semantic_collection=semantic,
+            similarity_threshold=float(os.getenv("PLANNER_SEMANTIC_THRESHOLD", "0.92")),
+        )
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Schedule a fire-and-forget task, keeping a reference until it completes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def drain(self):
+        """Wait for outstanding background writes (call before shutdown)."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _store_memory(self, user_request: str, session_id: str, results: list):
+        # Chroma embeds synchronously, so run it off the event loop
+        try:
+            await asyncio.to_thread(
+                self.memory.add_memories,
+                documents=[f"Request: {user_request}\nLog: {results}"],
+                metadatas=[{"session_id": session_id}],
+                ids=[str(uuid.uuid4())],
+            )
+        except Exception as e:
+            logger.warning(f"Could not store long-term memory for {session_id}: {e}")
+
+    async def _save_turn(self, session_id: str, state: AgentState, synced: int) -> int:
+        """
+        Persist the session after a turn. Writes only the history entries added
+        since the last save plus the current metadata when possible, instead of
+        re-serializing the whole state. Returns how many entries are now stored.
+        """
+        # Below the cap, history is append-only, so state.history[synced:] is exactly
+        # what the DB is missing. Once trimming can happen, rewrite the full state.
+        if synced and len(state.history) < MAX_HISTORY:
+            if await self.persistence.append_history(
+                session_id, state.history[synced:], metadata=state.metadata
+            ):
+                return len(state.history)
+        await self.persistence.save_session(session_id, state.model_dump())
+        return len(state.history)
+
     async def run(self, user_request: str, session_id: Optional[str] = None,
                   max_steps: int = 5) -> str:
         """Run the incremental Plan → Execute → Reflect loop.
@@ -46,16 +105,19 @@ class WorkflowEngine:
         # Load or create session state
         stored_state = await self.persistence.load_session(session_id)
         if stored_state:
-            state = AgentState(**stored_state)
+            # Validated when it was written; skip re-validating the round trip
+            state = AgentState.model_construct(**stored_state)
             logger.info(f"Resumed session {session_id}")
         else:
             state = AgentState(session_id=session_id)
             logger.info(f"Started new session {session_id}")
+        # History entries already persisted (0 → session row not written yet)
+        synced = len(state.history) if stored_state else 0
 
         results = []
         for i in range(max_steps):
             # 0. Context retrieval
-            memories = self.memory.search_memories(user_request)
+            memories = await asyncio.to_thread(self.memory.search_memories, user_request)
             context_str = str(memories.get("documents", []))
 
             # Start OTel-style trace for this turn
@@ -88,8 +150,12 @@ class WorkflowEngine:
                     "thought": step.thought,
                     "approve_endpoint": f"POST /sessions/{session_id}/approve"
                 })
-                await self.persistence.save_session(session_id, state.model_dump())
-                return json.dumps(results, indent=2)
+                await self._save_turn(session_id, state, synced)
+                turn_trace.finish(status="pending_approval", metadata={"tool": step.tool_name})
+                # The approval API (another process) reads this row as soon as
+                # it sees PENDING_APPROVAL, so it must be committed, not queued
+                await self.persistence.flush()
+                return serialization.dumps(results, indent=True)
 
             result = await self.executor.chat(step, state)
             results.append({"step": i + 1, "status": "executed",
@@ -99,7 +165,7 @@ class WorkflowEngine:
             state.metadata["human_approved"] = False
 
             # 3. Persist state
-            await self.persistence.save_session(session_id, state.model_dump())
+            synced = await self._save_turn(session_id, state, synced)
 
             # Finish trace
             turn_trace.finish(metadata={
@@ -110,11 +176,10 @@ class WorkflowEngine:
             if "FINISH" in step.thought.upper():
                 break
 
-        # 4. Long-term memory
-        self.memory.add_memories(
-            documents=[f"Request: {user_request}\nLog: {results}"],
-            metadatas=[{"session_id": session_id}],
-            ids=[str(uuid.uuid4())]
-        )
+        # 4. Long-term memory — written in the background, off the response path
+        self._spawn(self._store_memory(user_request, session_id, results))
 
-        return json.dumps(results, indent=2)
+        # Commit queued session saves before returning, so nothing from this run
+        # lands after (and overwrites) a later approval from the API
+        await self.persistence.flush()
+        return serialization.dumps(results, indent=True)
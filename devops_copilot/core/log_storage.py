@@ -4,57 +4,168 @@ Uses aiosqlite so log ingestion/queries never block the asyncio loop.
 """
 import aiosqlite
 import asyncio
-import json
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from devops_copilot.utils.logger import logger
+from devops_copilot.utils import serialization
+
+
+# Long-lived event loop backing the sync shims. Reusing one loop keeps the
+# shared aiosqlite connection warm instead of spinning up a thread + loop per call.
+_bg_loop = asyncio.new_event_loop()
+threading.Thread(target=_bg_loop.run_forever, name="log-storage-loop", daemon=True).start()
+
+
+_INSERT_LOG = "INSERT INTO logs (timestamp, service, level, message, metadata_json) VALUES (?,?,?,?,?)"
+_INSERT_SPIKE = "INSERT OR IGNORE INTO spike_tracker (service, spike_started_at) VALUES (?,?)"
 
 
 class LogStorage:
-    """Async Elasticsearch-like log store backed by SQLite via aiosqlite."""
+    """
+    Async Elasticsearch-like log store backed by one long-lived aiosqlite connection.
+
+    Single-row `ingest_log` calls are buffered and group-committed every
+    FLUSH_INTERVAL seconds or FLUSH_MAX_ROWS rows, whichever comes first.
+    Reads flush the buffer first, so callers always see their own writes.
+    """
+
+    FLUSH_INTERVAL = 0.05
+    FLUSH_MAX_ROWS = 500
 
     def __init__(self, db_path: str = "devops_logs.db"):
         self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        # Sync shims and direct awaits may run on different loops/threads,
+        # so the row buffer is guarded by a thread lock.
+        self._pending: List[tuple] = []
+        self._pending_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
 
     async def _init_db(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp REAL,
-                    service TEXT,
-                    level TEXT,
-                    message TEXT,
-                    metadata_json TEXT
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS spike_tracker (
-                    service TEXT PRIMARY KEY,
-                    spike_started_at REAL
-                )
-            """)
-            await db.commit()
+        db = await aiosqlite.connect(self.db_path)
+        # WAL lets readers proceed during writes; NORMAL sync is durable across
+        # application crashes and only risks the last commits on power loss.
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        await db.execute("PRAGMA temp_store=MEMORY")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL,
+                service TEXT,
+                level TEXT,
+                message TEXT,
+                metadata_json TEXT
+            )
+        """)
+        # Covering index for the windowed aggregates (error rate, window stats,
+        # buckets): service + timestamp range seek, level read from the index.
+        # It also serves query_logs' ORDER BY timestamp DESC without a sort.
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_logs_service_ts_level ON logs(service, timestamp, level)"
+        )
+        # Superseded by the covering index above
+        await db.execute("DROP INDEX IF EXISTS ix_logs_service_ts")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS spike_tracker (
+                service TEXT PRIMARY KEY,
+                spike_started_at REAL
+            )
+        """)
+        await db.commit()
+        self._db = db
         logger.info(f"[AsyncLogStorage] Initialized at {self.db_path}")
 
     async def setup(self):
-        """Call once on startup to ensure tables exist."""
-        await self._init_db()
+        """Call once on startup to open the shared connection and ensure tables exist."""
+        if self._db is None:
+            await self._init_db()
+
+    async def _conn(self) -> aiosqlite.Connection:
+        """Return the shared connection, opening it on first use."""
+        if self._db is None:
+            await self._init_db()
+        return self._db
+
+    async def close(self):
+        """Flush buffered logs and close the shared connection. The next call reopens it."""
+        await self.flush()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _write_rows(self, rows: List[tuple]):
+        """Insert rows and their spike_tracker upserts in one transaction."""
+        spikes: Dict[str, float] = {}
+        for ts, service, level, _, _ in rows:
+            if level == "ERROR" and service not in spikes:
+                spikes[service] = ts
+        db = await self._conn()
+        async with self._write_lock:
+            try:
+                await db.executemany(_INSERT_LOG, rows)
+                if spikes:
+                    await db.executemany(_INSERT_SPIKE, spikes.items())
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def flush(self):
+        """Commit any buffered `ingest_log` rows now. On failure they stay buffered."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            await self._write_rows(rows)
+        except Exception as e:
+            # Requeue ahead of anything buffered meanwhile; the next flush retries
+            with self._pending_lock:
+                self._pending[:0] = rows
+            logger.error(f"[AsyncLogStorage] Flush of {len(rows)} log rows failed, kept buffered: {e}")
+            raise
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+        finally:
+            # Also runs on cancellation (e.g. asyncio.run shutting down), so
+            # buffered rows are not lost with the loop.
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged; rows stay buffered for the next flush
 
     async def ingest_log(self, service: str, level: str, message: str,
                          metadata: Optional[Dict[str, Any]] = None):
-        ts = time.time()
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT INTO logs (timestamp, service, level, message, metadata_json) VALUES (?,?,?,?,?)",
-                (ts, service, level, message, json.dumps(metadata or {}))
-            )
-            if level == "ERROR":
-                await db.execute(
-                    "INSERT OR IGNORE INTO spike_tracker (service, spike_started_at) VALUES (?,?)",
-                    (service, ts)
-                )
-            await db.commit()
+        row = (time.time(), service, level, message, serialization.dumps(metadata or {}))
+        with self._pending_lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.FLUSH_MAX_ROWS
+        if full:
+            await self.flush()
+            return
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def ingest_logs(self, records: List[Dict[str, Any]]):
+        """
+        Bulk-insert log records with a single commit.
+        Each record needs service, level and message; metadata and timestamp are optional.
+        """
+        now = time.time()
+        rows = [
+            (r.get("timestamp", now), r["service"], r["level"], r["message"],
+             serialization.dumps(r.get("metadata") or {}))
+            for r in records
+        ]
+        if rows:
+            await self._write_rows(rows)
 
     async def query_logs(self, service: Optional[str] = None, level: Optional[str] = None,
                          start_time: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
@@ -68,64 +179,119 @@ class LogStorage:
             query += " AND timestamp >= ?"; params.append(start_time)
         query += " ORDER BY timestamp DESC LIMIT ?"; params.append(limit)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(query, params) as cursor:
-                rows = await cursor.fetchall()
+        await self.flush()
+        db = await self._conn()
+        async with db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
         return [
             {"timestamp": r[0], "service": r[1], "level": r[2],
-             "message": r[3], "metadata": json.loads(r[4])}
+             "message": r[3], "metadata": serialization.loads(r[4])}
             for r in rows
         ]
 
     async def get_error_rate(self, service: str, window_seconds: int = 300) -> float:
         start_time = time.time() - window_seconds
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT COUNT(*) FROM logs WHERE service=? AND timestamp>=?",
-                (service, start_time)
-            ) as cur:
-                total = (await cur.fetchone())[0]
-            if total == 0:
-                return 0.0
-            async with db.execute(
-                "SELECT COUNT(*) FROM logs WHERE service=? AND level='ERROR' AND timestamp>=?",
-                (service, start_time)
-            ) as cur:
-                errors = (await cur.fetchone())[0]
-        return errors / total
+        await self.flush()
+        db = await self._conn()
+        # Single pass over the (service, timestamp) index range for both counts
+        async with db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(level='ERROR'), 0) FROM logs "
+            "WHERE service=? AND timestamp>=?",
+            (service, start_time)
+        ) as cur:
+            total, errors = await cur.fetchone()
+        return errors / total if total else 0.0
+
+    async def get_window_stats(self, service: str,
+                               window_seconds: int = 300) -> Tuple[int, int, Optional[float]]:
+        """
+        (error_count, total_count, spike_start) for the window in one query:
+        both counts from the index range scan, spike start from spike_tracker.
+        """
+        start_time = time.time() - window_seconds
+        await self.flush()
+        db = await self._conn()
+        async with db.execute(
+            "SELECT COALESCE(SUM(level='ERROR'), 0), COUNT(*), "
+            "(SELECT spike_started_at FROM spike_tracker WHERE service=?) "
+            "FROM logs WHERE service=? AND timestamp>=?",
+            (service, service, start_time)
+        ) as cur:
+            errors, total, spike_start = await cur.fetchone()
+        return errors, total, spike_start
+
+    async def get_error_rate_buckets(self, service: str, window_seconds: int = 300,
+                                     bucket_seconds: int = 60) -> List[Dict[str, Any]]:
+        """
+        Per-bucket error rates over the window (e.g. per-minute dashboard series),
+        reduced inside SQLite in one indexed range scan rather than in Python.
+        """
+        start_time = time.time() - window_seconds
+        await self.flush()
+        db = await self._conn()
+        async with db.execute(
+            "SELECT CAST(timestamp / ? AS INTEGER) AS bucket, COUNT(*), "
+            "COALESCE(SUM(level='ERROR'), 0) FROM logs "
+            "WHERE service=? AND timestamp>=? GROUP BY bucket ORDER BY bucket",
+            (bucket_seconds, service, start_time)
+        ) as cur:
+            rows = await cur.fetchall()
+        return [
+            {"bucket_start": bucket * bucket_seconds, "total": total,
+             "errors": errors, "error_rate": errors / total}
+            for bucket, total, errors in rows
+        ]
 
     async def get_spike_start(self, service: str) -> Optional[float]:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT spike_started_at FROM spike_tracker WHERE service=?", (service,)
-            ) as cur:
-                row = await cur.fetchone()
+        await self.flush()
+        db = await self._conn()
+        async with db.execute(
+            "SELECT spike_started_at FROM spike_tracker WHERE service=?", (service,)
+        ) as cur:
+            row = await cur.fetchone()
         return row[0] if row else None
 
     async def clear_spike(self, service: str):
-        async with aiosqlite.connect(self.db_path) as db:
+        await self.flush()
+        db = await self._conn()
+        async with self._write_lock:
             await db.execute("DELETE FROM spike_tracker WHERE service=?", (service,))
             await db.commit()
 
+    async def _ingest_committed(self, service: str, level: str, message: str,
+                                metadata: Optional[Dict[str, Any]]):
+        await self.ingest_log(service, level, message, metadata)
+        await self.flush()
+
     # ── Sync shims ─────────────────────────────────────────────────────────────
-    # Tool functions are synchronous. These shims run async methods in a fresh
-    # background thread with its own event loop, so they are safe to call from
+    # Tool functions are synchronous. These shims submit async methods to the
+    # module's background event loop thread, so they are safe to call from
     # inside an already-running asyncio event loop (e.g. the engine's loop).
+    # Writes are committed before a shim returns: the background loop is never
+    # shut down, so a buffered row would have no flush-on-exit to save it.
 
     def _run_sync(self, coro):
-        """Run an async coroutine in a dedicated background thread."""
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-            future = pool.submit(asyncio.run, coro)
-            return future.result()
+        """Run an async coroutine on the shared background loop and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, _bg_loop).result()
 
     def ingest_log_sync(self, service: str, level: str, message: str,
                         metadata: Optional[Dict[str, Any]] = None):
-        self._run_sync(self.ingest_log(service, level, message, metadata))
+        self._run_sync(self._ingest_committed(service, level, message, metadata))
+
+    def ingest_logs_sync(self, records: List[Dict[str, Any]]):
+        self._run_sync(self.ingest_logs(records))
 
     def get_error_rate_sync(self, service: str, window_seconds: int = 300) -> float:
         return self._run_sync(self.get_error_rate(service, window_seconds))
 
+    def get_window_stats_sync(self, service: str,
+                              window_seconds: int = 300) -> Tuple[int, int, Optional[float]]:
+        return self._run_sync(self.get_window_stats(service, window_seconds))
+
+    def get_error_rate_buckets_sync(self, service: str, window_seconds: int = 300,
+                                    bucket_seconds: int = 60) -> List[Dict[str, Any]]:
+        return self._run_sync(self.get_error_rate_buckets(service, window_seconds, bucket_seconds))
+
     def get_spike_start_sync(self, service: str) -> Optional[float]:
         return self._run_sync(self.get_spike_start(service))
 
@@ -135,3 +301,9 @@ class LogStorage:
     def query_logs_sync(self, service: Optional[str] = None, level: Optional[str] = None,
                         start_time: Optional[float] = None, limit: int = 100):
         return self._run_sync(self.query_logs(service, level, start_time, limit))
+
+    def flush_sync(self):
+        self._run_sync(self.flush())
+
+    def close_sync(self):
+        self._run_sync(self.close())
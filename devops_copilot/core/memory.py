@@ -1,6 +1,7 @@
 import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
+import functools
 import os
 from devops_copilot.utils.logger import logger
 
@@ -10,6 +11,9 @@ class MemorySystem:
     def __init__(self, persist_directory: str = "./chroma_db"):
         self.client = chromadb.PersistentClient(path=persist_directory)
         self.collection = self.client.get_or_create_collection(name="agent_memory")
+        # Per-instance LRU over (query, n_results); the engine re-queries the
+        # same request every step. Cleared whenever memories are added.
+        self._cached_query = functools.lru_cache(maxsize=256)(self._query)
         logger.info(f"Memory system initialized at {persist_directory}")
 
     def add_memories(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
@@ -19,15 +23,22 @@ class MemorySystem:
             metadatas=metadatas,
             ids=ids
         )
+        self._cached_query.cache_clear()
         logger.info(f"Added {len(documents)} memories to vector store.")
 
     def search_memories(self, query: str, n_results: int = 5) -> Dict[str, Any]:
-        """Searches for relevant memories."""
-        results = self.collection.query(
+        """Searches for relevant memories. Results are shared; treat them as read-only."""
+        return self._cached_query(query, n_results)
+
+    def _query(self, query: str, n_results: int) -> Dict[str, Any]:
+        return self.collection.query(
             query_texts=[query],
             n_results=n_results
         )
-        return results
+
+    def get_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None):
+        """Returns (creating if needed) an auxiliary collection on the same client."""
+        return self.client.get_or_create_collection(name=name, metadata=metadata)
 
 class SessionManager:
     """Handles ephemeral session state."""
@@ -1,4 +1,6 @@
 from prometheus_client import Counter, Histogram, Gauge, start_http_server
+from collections import deque
+import inspect
 import time
 from functools import wraps
 from typing import Callable, Any
@@ -10,6 +12,11 @@ TOOL_CALL_SUCCESS = Counter("tool_call_success_total", "Total successful tool ca
 TOOL_CALL_FAILURE = Counter("tool_call_failure_total", "Total failed tool calls", ["tool_name"])
 TOOL_CALL_LATENCY = Histogram("tool_call_latency_seconds", "Latency of tool calls in seconds", ["tool_name"])
 AGENT_FAILURE = Counter("agent_failure_total", "Total agent failures", ["agent_name"])
+PLANNER_PARSE_RECOVERY = Counter(
+    "planner_parse_recovery_total",
+    "Planner responses that failed strict JSON parsing, by recovery path",
+    ["path"]
+)
 
 # === DevOps Copilot Metrics ===
 ANOMALY_DETECTION_TIME = Histogram(
@@ -19,30 +26,49 @@ ANOMALY_DETECTION_TIME = Histogram(
 )
 FALSE_POSITIVE_TOTAL = Counter("devops_false_positive_total", "Total false positive anomaly alerts")
 ACTIVE_INCIDENTS = Gauge("devops_active_incidents", "Number of currently open incidents")
-REMEDIATION_SUCCESS = Counter("devops_remediation_success_total", "Successful auto-remediations", ["service"])
-REMEDIATION_FAILURE = Counter("devops_remediation_failure_total", "Failed auto-remediations", ["service"])
+REMEDIATION_TOTAL = Counter("devops_remediation_total", "Auto-remediations by outcome", ["service", "status"])
+SESSION_CACHE_HITS = Counter("devops_session_cache_hits_total", "Session reads served from the API cache")
 
 def start_metrics_server():
     port = int(os.getenv("PROMETHEUS_PORT", 8000))
     start_http_server(port)
-    logger.info(f"Prometheus metrics server started on port {port}")
+    logger.info("Prometheus metrics server started on port %d", port)
 
 def track_tool_metrics(tool_name: str):
-    """Decorator to track tool execution metrics."""
+    """Decorator to track tool execution metrics. Supports sync and async tools."""
     def decorator(func: Callable):
+        # Resolve labelled children once instead of a .labels() lookup per call
+        success = TOOL_CALL_SUCCESS.labels(tool_name=tool_name)
+        failure = TOOL_CALL_FAILURE.labels(tool_name=tool_name)
+        latency = TOOL_CALL_LATENCY.labels(tool_name=tool_name)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_ns = time.perf_counter_ns()
+                try:
+                    result = await func(*args, **kwargs)
+                    success.inc()
+                    return result
+                except Exception:
+                    failure.inc()
+                    raise
+                finally:
+                    latency.observe((time.perf_counter_ns() - start_ns) * 1e-9)
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
             try:
                 result = func(*args, **kwargs)
-                TOOL_CALL_SUCCESS.labels(tool_name=tool_name).inc()
+                success.inc()
                 return result
-            except Exception as e:
-                TOOL_CALL_FAILURE.labels(tool_name=tool_name).inc()
-                raise e
+            except Exception:
+                failure.inc()
+                raise
             finally:
-                latency = time.time() - start_time
-                TOOL_CALL_LATENCY.labels(tool_name=tool_name).observe(latency)
+                latency.observe((time.perf_counter_ns() - start_ns) * 1e-9)
         return wrapper
     return decorator
 
@@ -50,18 +76,23 @@ class RateLimiter:
     """Sliding window rate limiter for precision."""
     def __init__(self, requests_per_minute: int = 60):
         self.rpm = requests_per_minute
-        self.requests = []
+        # Monotonic admission times, oldest first
+        self.requests: deque = deque()
+
+    def _expire(self, now: float):
+        cutoff = now - 60
+        while self.requests and self.requests[0] <= cutoff:
+            self.requests.popleft()
 
     def acquire(self):
-        now = time.time()
-        # Remove requests older than 60s
-        self.requests = [r for r in self.requests if r > now - 60]
-        
+        now = time.monotonic()
+        self._expire(now)
+
         if len(self.requests) >= self.rpm:
             wait_time = 60 - (now - self.requests[0])
-            logger.warning(f"Sliding window full. Waiting {wait_time:.2f}s")
+            logger.warning("Sliding window full. Waiting %.2fs", wait_time)
             time.sleep(wait_time)
-            now = time.time() # Update now after sleep
-            self.requests = [r for r in self.requests if r > now - 60]
-        
+            now = time.monotonic() # Update now after sleep
+            self._expire(now)
+
         self.requests.append(now)
@@ -2,57 +2,227 @@
 persistence.py — Async SQLite session state (non-blocking)
 """
 import aiosqlite
-import json
-from typing import Dict, Any, Optional, List
+import asyncio
+import sqlite3
+from typing import AsyncIterator, Dict, Any, Optional, List
+from devops_copilot.utils import serialization
 from devops_copilot.utils.logger import logger
 
+# SQL text is kept constant so sqlite3's per-connection statement cache
+# (sized via STATEMENT_CACHE_SIZE) reuses the prepared statements.
+_SQL_CREATE = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        state_json TEXT,
+        updated_at REAL DEFAULT (strftime('%s', 'now'))
+    )
+"""
+_SQL_UPSERT = "INSERT OR REPLACE INTO sessions (session_id, state_json) VALUES (?,?)"
+_SQL_SELECT_ONE = "SELECT state_json FROM sessions WHERE session_id=?"
+_SQL_LIST = "SELECT session_id FROM sessions"
+
+
+def _first_column(cursor, row):
+    """Row factory for single-column queries: yield the value, not a 1-tuple."""
+    return row[0]
+
+# In-place session edits via SQLite's JSON1 functions — the edit happens in
+# SQLite, so the full state never round-trips through Python.
+_SQL_SET_METADATA = """
+    UPDATE sessions
+    SET state_json = json_set(state_json, '$.metadata', json(?)),
+        updated_at = strftime('%s', 'now')
+    WHERE session_id=?
+"""
+_SQL_TOUCH = "UPDATE sessions SET updated_at = strftime('%s', 'now') WHERE session_id=?"
+_SQL_SET_APPROVED = """
+    UPDATE sessions
+    SET state_json = json_set(state_json, '$.metadata',
+            json_set(COALESCE(json_extract(state_json, '$.metadata'), '{}'),
+                     '$.human_approved', json('true'))),
+        updated_at = strftime('%s', 'now')
+    WHERE session_id=?
+"""
+_SQL_SET_REJECTED = """
+    UPDATE sessions
+    SET state_json = json_set(state_json, '$.metadata',
+            json_set(COALESCE(json_extract(state_json, '$.metadata'), '{}'),
+                     '$.human_approved', json('false'), '$.rejected', json('true'))),
+        updated_at = strftime('%s', 'now')
+    WHERE session_id=?
+"""
+_SQL_APPEND_HISTORY = (
+    "UPDATE sessions SET state_json = json_insert(state_json, '$.history[#]', json(?)) "
+    "WHERE session_id=?"
+)
+
 
 class PersistenceLayer:
-    """Async session state store backed by SQLite via aiosqlite."""
+    """
+    Async session state store backed by one long-lived aiosqlite connection.
+
+    Full-state saves are coalesced: each session keeps only its newest pending
+    state, and all pending sessions are committed in one transaction within
+    FLUSH_INTERVAL seconds. Reads see pending writes immediately.
+    """
+
+    FLUSH_INTERVAL = 0.02
+    STATEMENT_CACHE_SIZE = 256
 
     def __init__(self, db_path: str = "agentnexus_state.db"):
         self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        # Serializes write transactions; WAL readers don't need it
+        self._lock = asyncio.Lock()
+        # session_id → encoded state, waiting for / being written by flush()
+        self._pending: Dict[str, str] = {}
+        self._inflight: Dict[str, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
 
     async def setup(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS sessions (
-                    session_id TEXT PRIMARY KEY,
-                    state_json TEXT,
-                    updated_at REAL DEFAULT (strftime('%s', 'now'))
-                )
-            """)
-            await db.commit()
-        logger.info(f"[AsyncPersistence] Initialized at {self.db_path}")
+        """Open the shared connection and ensure the table exists. Idempotent."""
+        if self._db is not None:
+            return
+        db = await aiosqlite.connect(self.db_path, cached_statements=self.STATEMENT_CACHE_SIZE)
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        await db.execute("PRAGMA temp_store=MEMORY")
+        await db.execute("PRAGMA cache_size=-64000")  # ~64 MB page cache
+        await db.execute(_SQL_CREATE)
+        await db.commit()
+        self._db = db
+        logger.info("[AsyncPersistence] Initialized at %s", self.db_path)
+
+    async def _conn(self) -> aiosqlite.Connection:
+        """Return the shared connection, opening it on first use."""
+        if self._db is None:
+            await self.setup()
+        return self._db
+
+    async def close(self):
+        """Flush pending saves and close the shared connection. The next call reopens it."""
+        await self.flush()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
 
     async def save_session(self, session_id: str, state: Dict[str, Any]):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO sessions (session_id, state_json) VALUES (?,?)",
-                (session_id, json.dumps(state))
-            )
-            await db.commit()
-        logger.debug(f"Saved session {session_id}")
+        """Queue a full-state write; committed by the next flush."""
+        # Encoded inline: history is capped (MAX_HISTORY), so even a full state
+        # takes microseconds — less than an executor hand-off would cost.
+        self._pending[session_id] = serialization.dumps(state)
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+        finally:
+            # Also runs on cancellation, so queued saves survive loop shutdown
+            try:
+                await self.flush()
+            except Exception:
+                pass  # already logged; saves stay queued for the next flush
+
+    async def flush(self):
+        """Commit all pending saves in a single transaction."""
+        if not self._pending:
+            return
+        db = await self._conn()
+        async with self._lock:
+            self._inflight, self._pending = self._pending, {}
+            try:
+                await db.executemany(_SQL_UPSERT, list(self._inflight.items()))
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                # Put the rows back unless a newer save superseded them
+                self._pending = {**self._inflight, **self._pending}
+                logger.error("Flush of %d session(s) failed, kept queued: %s", len(self._inflight), e)
+                raise
+            finally:
+                saved, self._inflight = len(self._inflight), {}
+        logger.debug("Saved %d session(s)", saved)
 
     async def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT state_json FROM sessions WHERE session_id=?", (session_id,)
-            ) as cur:
-                row = await cur.fetchone()
-        return json.loads(row[0]) if row else None
+        queued = self._pending.get(session_id) or self._inflight.get(session_id)
+        if queued is not None:
+            return serialization.loads(queued)
+        db = await self._conn()
+        async with db.execute(_SQL_SELECT_ONE, (session_id,)) as cur:
+            row = await cur.fetchone()
+        return serialization.loads(row[0]) if row else None
+
+    async def append_history(self, session_id: str, entries: List[Dict[str, Any]],
+                             metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Append history entries and, if given, replace the stored metadata with
+        `metadata` in one transaction, without re-writing the rest of the state.
+        The result matches what save_session would store for the same state.
+        Returns False if the session row doesn't exist or the stored state
+        can't be patched; callers should fall back to save_session.
+        """
+        await self.flush()  # the row must reflect any queued full save first
+        db = await self._conn()
+        async with self._lock:
+            try:
+                if metadata is None:
+                    cur = await db.execute(_SQL_TOUCH, (session_id,))
+                else:
+                    cur = await db.execute(
+                        _SQL_SET_METADATA, (serialization.dumps(metadata), session_id)
+                    )
+                if cur.rowcount == 0:
+                    await db.rollback()
+                    return False
+                if entries:
+                    await db.executemany(
+                        _SQL_APPEND_HISTORY,
+                        [(serialization.dumps(entry), session_id) for entry in entries]
+                    )
+            except sqlite3.OperationalError as e:
+                await db.rollback()
+                logger.warning("Delta save failed for session %s: %s", session_id, e)
+                return False
+            await db.commit()
+        logger.debug("Appended %d history entries to session %s", len(entries), session_id)
+        return True
+
+    async def set_metadata(self, session_id: str, metadata: Dict[str, Any]) -> bool:
+        """Replace the stored session metadata. See append_history."""
+        return await self.append_history(session_id, [], metadata=metadata)
+
+    async def iter_sessions(self) -> AsyncIterator[str]:
+        """Yield session ids as they're read, without materializing the table."""
+        await self.flush()
+        db = await self._conn()
+        async with db.execute(_SQL_LIST) as cur:
+            cur.row_factory = _first_column
+            async for session_id in cur:
+                yield session_id
 
     async def list_sessions(self) -> List[str]:
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("SELECT session_id FROM sessions") as cur:
-                rows = await cur.fetchall()
-        return [r[0] for r in rows]
+        return [session_id async for session_id in self.iter_sessions()]
+
+    async def _patch_flags(self, sql: str, session_id: str):
+        """Apply an in-SQL metadata flag update; KeyError if the session is unknown."""
+        await self.flush()  # apply any queued full save before patching the row
+        db = await self._conn()
+        async with self._lock:
+            cur = await db.execute(sql, (session_id,))
+            if cur.rowcount == 0:
+                await db.rollback()
+                raise KeyError(f"Session '{session_id}' not found.")
+            await db.commit()
 
     async def set_approved(self, session_id: str):
         """Set human_approved=True in session metadata. Called by the API."""
-        state = await self.load_session(session_id)
-        if state is None:
-            raise KeyError(f"Session '{session_id}' not found.")
-        state.setdefault("metadata", {})["human_approved"] = True
-        await self.save_session(session_id, state)
-        logger.info(f"✅ Approval granted for session {session_id}")
+        await self._patch_flags(_SQL_SET_APPROVED, session_id)
+        logger.info("✅ Approval granted for session %s", session_id)
+
+    async def set_rejected(self, session_id: str):
+        """Set human_approved=False, rejected=True in session metadata. Called by the API."""
+        await self._patch_flags(_SQL_SET_REJECTED, session_id)
+        logger.info("Rejection recorded for session %s", session_id)
@@ -1,23 +1,34 @@
 import asyncio
+import random
 from functools import wraps
-from typing import Callable, Any
+from typing import Callable, Any, Tuple, Type
 from devops_copilot.utils.logger import logger
 
-def retry_on_failure(retries: int = 3, backoff: float = 1.0):
-    """Decorator for async retry logic with exponential backoff."""
+def retry_on_failure(retries: int = 3, backoff: float = 1.0,
+                     retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+                     jitter: float = 0.1):
+    """
+    Decorator for async retry logic with exponential backoff.
+    Only exceptions in `retry_on` are retried; anything else (and cancellation)
+    propagates immediately. Each wait adds up to `jitter` seconds of random
+    delay so concurrent callers don't retry in lockstep.
+    """
+    # Base waits between attempts, computed once; none after the final attempt
+    schedule = [backoff * (1 << attempt) for attempt in range(max(retries - 1, 0))]
+
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(retries):
+            for attempt, base in enumerate(schedule):
                 try:
                     return await func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    wait = backoff * (2 ** attempt)
-                    logger.error(f"Attempt {attempt + 1} failed: {e}. Retrying in {wait}s...")
+                except asyncio.CancelledError:
+                    raise
+                except retry_on as e:
+                    wait = base + random.uniform(0, jitter)
+                    logger.error("Attempt %d failed: %s. Retrying in %.2fs...", attempt + 1, e, wait)
                     await asyncio.sleep(wait)
-            raise last_exception
+            return await func(*args, **kwargs)
         return wrapper
     return decorator
 
@@ -29,5 +40,5 @@ class ResilienceLayer:
         try:
             return await primary_coro
         except Exception as e:
-            logger.warning(f"Primary path failed: {e}. Executing fallback...")
+            logger.warning("Primary path failed: %s. Executing fallback...", e)
             return await fallback_coro
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import time
 import uuid
 from typing import Dict, Any, List, Optional
@@ -5,63 +7,109 @@ from devops_copilot.utils.logger import logger
 
 class Trace:
     """Represents a single execution trace for a step."""
-    def __init__(self, step_name: str, parent_id: Optional[str] = None):
+    def __init__(self, step_name: str, parent_id: Optional[str] = None,
+                 tracer: Optional["Tracer"] = None):
         self.trace_id = str(uuid.uuid4())
         self.parent_id = parent_id
         self.step_name = step_name
-        self.start_time = time.time()
-        self.end_time: Optional[float] = None
+        # Monotonic nanoseconds: immune to wall-clock jumps, converted only for display
+        self.start_ns = time.monotonic_ns()
+        self.end_ns: Optional[int] = None
         self.metadata: Dict[str, Any] = {}
         self.status: str = "running"
+        self._tracer = tracer
 
     def finish(self, status: str = "success", metadata: Optional[Dict[str, Any]] = None):
-        self.end_time = time.time()
+        self.end_ns = time.monotonic_ns()
         self.status = status
         if metadata:
             self.metadata.update(metadata)
-        duration = self.end_time - self.start_time
-        logger.info(f"Trace {self.step_name} finished in {duration:.3f}s with status {self.status}")
+        logger.info("Trace %s finished in %.3fs with status %s",
+                    self.step_name, (self.end_ns - self.start_ns) / 1e9, self.status)
+        if self._tracer is not None:
+            self._tracer.active_traces.pop(self.trace_id, None)
 
 class Tracer:
-    """Manages execution traces (OTel-style concepts)."""
-    def __init__(self):
+    """
+    Manages execution traces (OTel-style concepts).
+    Only unfinished traces are tracked: finish() removes a trace, and past
+    max_active the oldest (insertion order) are evicted as abandoned.
+    """
+    def __init__(self, max_active: int = 10_000):
+        self.max_active = max_active
         self.active_traces: Dict[str, Trace] = {}
 
     def start_trace(self, step_name: str, parent_id: Optional[str] = None) -> Trace:
-        trace = Trace(step_name, parent_id)
+        trace = Trace(step_name, parent_id, tracer=self)
+        while len(self.active_traces) >= self.max_active:
+            del self.active_traces[next(iter(self.active_traces))]
         self.active_traces[trace.trace_id] = trace
         return trace
 
+# Atomic sliding-window check: prune, count and conditionally admit in one
+# round trip. Members are "{now_ms}:{uuid4}" so same-millisecond calls from
+# different workers don't collide.
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+  redis.call('ZADD', key, now, ARGV[4])
+  redis.call('PEXPIRE', key, window)
+  return {1, count + 1}
+end
+return {0, count}
+"""
+
+
 class DistributedRateLimiter:
     """
-    Conceptual Distributed Rate Limiter.
-    In a real production environment, this would interface with Redis.
+    Sliding-window rate limiter shared across workers via Redis.
+    Pass a `redis.asyncio.Redis` client, or one is created from REDIS_URL.
     """
-    def __init__(self, key: str, rpm: int = 60):
+    WINDOW_MS = 60_000
+
+    def __init__(self, key: str, rpm: int = 60, client=None):
         self.key = key
         self.rpm = rpm
-        # Conceptually, this would use a Redis client
-        # self.redis = redis.Redis(...)
+        self._client = client
+        self._sha: Optional[str] = None
+        self._load_lock = asyncio.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            import redis.asyncio as redis  # optional dependency, only needed here
+            self._client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return self._client
+
+    async def _script_sha(self, stale: Optional[str] = None) -> str:
+        """SCRIPT LOAD once; reload only if `stale` is still the cached sha."""
+        async with self._load_lock:
+            if self._sha is None or self._sha == stale:
+                self._sha = await self._redis().script_load(_SLIDING_WINDOW_LUA)
+            return self._sha
+
+    async def acquire(self) -> bool:
+        """Record a request if the window has room. Returns False when rate limited."""
+        from redis.exceptions import NoScriptError
+
+        client = self._redis()
+        sha = self._sha or await self._script_sha()
+        now_ms = int(time.time() * 1000)
+        args = (now_ms, self.WINDOW_MS, self.rpm, f"{now_ms}:{uuid.uuid4()}")
+        try:
+            allowed, count = await client.evalsha(sha, 1, self.key, *args)
+        except NoScriptError:
+            # Script cache was flushed (restart/failover): reload and retry once
+            sha = await self._script_sha(stale=sha)
+            allowed, count = await client.evalsha(sha, 1, self.key, *args)
 
-    async def acquire(self):
-        """
-        Simulates a distributed sliding window check.
-        Logic: ZREMRANGEBYSCORE (key, 0, now-60) -> ZCARD (key) -> ZADD (key, now, now)
-        """
-        now = time.time()
-        logger.debug(f"[Distributed] Checking rate limit for {self.key}")
-        
-        # Mocking distributed behavior
-        # In a real app:
-        # pipe = self.redis.pipeline()
-        # pipe.zremrangebyscore(self.key, 0, now - 60)
-        # pipe.zcard(self.key)
-        # _, count = pipe.execute()
-        
-        # if count >= self.rpm:
-        #     raise Exception("Rate limit exceeded")
-        
-        return True
+        if not allowed:
+            logger.warning(f"[Distributed] Rate limit reached for {self.key} ({count}/{self.rpm})")
+        return bool(allowed)
 
 # Global tracer instance
 tracer = Tracer()
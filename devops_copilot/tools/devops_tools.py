@@ -6,17 +6,29 @@ from devops_copilot.core.log_storage import LogStorage
 from devops_copilot.core.config import thresholds
 from devops_copilot.core.observability import (
     track_tool_metrics, ACTIVE_INCIDENTS,
-    REMEDIATION_SUCCESS, REMEDIATION_FAILURE,
+    REMEDIATION_TOTAL,
     ANOMALY_DETECTION_TIME
 )
 from devops_copilot.utils.logger import logger
 from typing import Optional, Dict, Any
+import functools
 import time
 
 # Shared async log store instance
 log_store = LogStorage()
 
 
+def _svc(service: str) -> str:
+    """Metric label for a service: its canonical name if configured, else "other" (see ThresholdConfig)."""
+    return thresholds.service_label(service)
+
+
+@functools.lru_cache(maxsize=None)
+def _remediation_counter(service: str, status: str):
+    """Memoized REMEDIATION_TOTAL child, so repeat increments skip .labels()."""
+    return REMEDIATION_TOTAL.labels(service=service, status=status)
+
+
 @registry.register(name="search_logs", description="Search production logs for a service.")
 @track_tool_metrics("search_logs")
 def search_logs(service: str, level: Optional[str] = None, minutes_ago: int = 5) -> str:
@@ -33,26 +45,22 @@ def search_logs(service: str, level: Optional[str] = None, minutes_ago: int = 5)
 @track_tool_metrics("get_metrics")
 def get_metrics(service: str) -> Dict[str, Any]:
     window = thresholds.window_seconds(service)
-    error_rate = log_store.get_error_rate_sync(service, window_seconds=window)
+    errors, log_count, spike_start = log_store.get_window_stats_sync(service, window_seconds=window)
+    error_rate = errors / log_count if log_count else 0.0
     threshold = thresholds.error_rate_threshold(service)
 
     # Require minimum log volume before triggering anomaly (avoids cold-start noise)
-    total_logs = log_store.query_logs_sync(
-        service=service,
-        start_time=time.time() - window,
-    )
-    enough_data = len(total_logs) >= thresholds.MIN_LOG_VOLUME
+    enough_data = log_count >= thresholds.MIN_LOG_VOLUME
 
     is_anomaly = enough_data and (error_rate > threshold)
     status = "CRITICAL" if is_anomaly else ("HEALTHY" if enough_data else "INSUFFICIENT_DATA")
 
     if is_anomaly:
         ACTIVE_INCIDENTS.inc()
-        spike_start = log_store.get_spike_start_sync(service)
         if spike_start:
             mttd = min(time.time() - spike_start, thresholds.MTTD_CEILING_SECONDS)
             ANOMALY_DETECTION_TIME.observe(mttd)
-            logger.info(f"MTTD for {service}: {mttd:.2f}s (threshold={threshold*100:.0f}%, window={window}s)")
+            logger.info("MTTD for %s: %.2fs (threshold=%.0f%%, window=%ds)", service, mttd, threshold * 100, window)
 
     return {
         "service": service,
@@ -61,7 +69,7 @@ def get_metrics(service: str) -> Dict[str, Any]:
         "window_seconds": window,
         "status": status,
         "anomaly_detected": is_anomaly,
-        "log_count": len(total_logs),
+        "log_count": log_count,
         "timestamp": time.time()
     }
 
@@ -69,19 +77,19 @@ def get_metrics(service: str) -> Dict[str, Any]:
 @registry.register(name="restart_service", description="Restart a failing service. REQUIRES APPROVAL.")
 @track_tool_metrics("restart_service")
 def restart_service(service: str, reason: str) -> str:
-    logger.warning(f"RESTARTING SERVICE: {service} | reason: {reason}")
+    logger.warning("RESTARTING SERVICE: %s | reason: %s", service, reason)
     try:
-        REMEDIATION_SUCCESS.labels(service=service).inc()
+        _remediation_counter(_svc(service), "success").inc()
         ACTIVE_INCIDENTS.dec()
         log_store.clear_spike_sync(service)
         return f"Service {service} successfully restarted. Reason: {reason}"
     except Exception as e:
-        REMEDIATION_FAILURE.labels(service=service).inc()
+        _remediation_counter(_svc(service), "failure").inc()
         raise e
 
 
 @registry.register(name="slack_notify", description="Send a message to the DevOps Slack channel.")
 @track_tool_metrics("slack_notify")
 def slack_notify(channel: str, message: str) -> str:
-    logger.info(f"SLACK [{channel}]: {message}")
+    logger.info("SLACK [%s]: %s", channel, message)
     return f"Notification sent to #{channel}"
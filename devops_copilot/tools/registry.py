@@ -8,6 +8,8 @@ class Tool(BaseModel):
     name: str
     description: str
     parameters_schema: Type[BaseModel]
+    # parameters_schema.model_json_schema(), generated once at registration
+    json_schema: Dict[str, Any]
     func: Callable
     
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -17,15 +19,27 @@ class Tool(BaseModel):
         Executes the tool with validation.
         IMPORTANT: All arguments are validated against parameters_schema before execution.
         """
-        logger.info(f"Executing tool: {self.name} with params: {kwargs}")
-        validated_params = self.parameters_schema(**kwargs)
-        return self.func(**validated_params.model_dump())
+        logger.info("Executing tool: %s with params: %s", self.name, kwargs)
+        validated_params = self.parameters_schema.model_validate(kwargs)
+        # Field values are already coerced; skip model_dump()'s deep copy
+        return self.func(**validated_params.__dict__)
+
+    @property
+    def is_async(self) -> bool:
+        """True if the tool returns an awaitable (looks through decorators)."""
+        return inspect.iscoroutinefunction(inspect.unwrap(self.func))
+
+    def execute_trusted(self, **kwargs) -> Any:
+        """Call the tool without validation, for internal callers whose arguments are already validated."""
+        return self.func(**kwargs)
 
 class ToolRegistry:
     """Registry for managing and validating tools."""
     
     def __init__(self):
         self._tools: Dict[str, Tool] = {}
+        # Bumped on every mutation so callers can memoize derived views.
+        self.version = 0
 
     def register(self, name: str, description: str):
         """Decorator to register a function as a tool."""
@@ -45,9 +59,11 @@ class ToolRegistry:
                 name=name,
                 description=description,
                 parameters_schema=pydantic_model,
+                json_schema=pydantic_model.model_json_schema(),
                 func=func
             )
             self._tools[name] = tool
+            self.version += 1
             logger.info(f"Registered tool: {name}")
             return func
         return decorator
@@ -60,7 +76,7 @@ class ToolRegistry:
             {
                 "name": tool.name,
                 "description": tool.description,
-                "parameters": tool.parameters_schema.model_json_schema()
+                "parameters": tool.json_schema
             }
             for tool in self._tools.values()
         ]
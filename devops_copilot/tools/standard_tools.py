@@ -1,37 +1,134 @@
 from devops_copilot.tools.registry import registry
 from devops_copilot.core.observability import track_tool_metrics
+from typing import Optional
+import asyncio
+import contextlib
+import functools
+import hashlib
 import httpx
 import json
+import os
+import tempfile
+
+# Shared pooled client for HTTP-backed tools, created on first use in the
+# running loop (an AsyncClient's connections are bound to one event loop).
+_http: Optional[httpx.AsyncClient] = None
+_http_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _http_client() -> httpx.AsyncClient:
+    global _http, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http is None or _http.is_closed or _http_loop is not loop:
+        _http = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        _http_loop = loop
+    return _http
+
+async def close_http_client():
+    """Close the shared HTTP client. Call before the event loop shuts down."""
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
 
 @registry.register(name="web_search", description="Search the web for information.")
 @track_tool_metrics("web_search")
-def web_search(query: str) -> str:
-    """Simulates a web search tool."""
-    return f"Search results for: {query}. (Mocked response: Found info about Multi-Agent LLMs)"
+async def web_search(query: str) -> str:
+    """Search via the endpoint in WEB_SEARCH_URL; mocked when it isn't set."""
+    url = os.getenv("WEB_SEARCH_URL")
+    if not url:
+        return f"Search results for: {query}. (Mocked response: Found info about Multi-Agent LLMs)"
+    response = await _http_client().get(url, params={"q": query})
+    response.raise_for_status()
+    return f"Search results for: {query}.\n{response.text[:2000]}"
 
 from simpleeval import SimpleEval
 
+# One evaluator for all calls; parsed expressions are memoized (bounded, since
+# the input comes from the LLM).
+_evaluator = SimpleEval()
+
+@functools.lru_cache(maxsize=1024)
+def _parse(expression: str):
+    return _evaluator.parse(expression)
+
 @registry.register(name="calculator", description="Perform basic math operations securely.")
 @track_tool_metrics("calculator")
 def calculator(expression: str) -> float:
     """Evaluates a math expression securely using simpleeval."""
     try:
-        s = SimpleEval()
-        return float(s.eval(expression))
+        return float(_evaluator.eval(expression, previously_parsed=_parse(expression)))
     except Exception as e:
         return f"Error evaluating expression: {str(e)}"
 
+# File mode for new files, as a plain open() would create them (mkstemp uses 0600)
+_umask = os.umask(0)
+os.umask(_umask)
+_NEW_FILE_MODE = 0o666 & ~_umask
+
+def _atomic_write(path: str, data: bytes):
+    """Write via a unique temp file + os.replace so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                               prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = _NEW_FILE_MODE
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+def _record_digest(filename: str, sidecar: str, digest: str):
+    """Store digest + the file's current size/mtime, so later edits invalidate it."""
+    st = os.stat(filename)
+    _atomic_write(sidecar, f"{digest} {st.st_size} {st.st_mtime_ns}".encode())
+
+def _unchanged(filename: str, sidecar: str, data: bytes, digest: str) -> bool:
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return False
+    if st.st_size != len(data):
+        return False
+    try:
+        with open(sidecar) as f:
+            recorded = f.read().split()
+    except FileNotFoundError:
+        recorded = []
+    # Trust the digest only if the file hasn't been touched since it was recorded
+    if recorded == [digest, str(st.st_size), str(st.st_mtime_ns)]:
+        return True
+    with open(filename, 'rb') as f:
+        same = f.read() == data
+    if same:
+        _record_digest(filename, sidecar, digest)
+    return same
+
 @registry.register(name="idempotent_write", description="Write data to a file safely.")
 @track_tool_metrics("idempotent_write")
 def idempotent_write(filename: str, content: str) -> str:
-    """An idempotent file write operation."""
-    # Check if content is same to avoid unnecessary writes
-    import os
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            if f.read() == content:
-                return "File already contains this content. No change."
-    
-    with open(filename, 'w') as f:
-        f.write(content)
+    """
+    An idempotent file write operation.
+    Keeps a `<filename>.blake` sidecar (content digest, size, mtime) next to
+    each file it writes, so repeat writes of the same content skip reading the
+    file. Any external modification changes size or mtime and forces a real
+    byte comparison.
+    """
+    data = content.encode()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    sidecar = f"{filename}.blake"
+
+    if _unchanged(filename, sidecar, data, digest):
+        return "File already contains this content. No change."
+
+    _atomic_write(filename, data)
+    _record_digest(filename, sidecar, digest)
     return f"Successfully wrote to {filename}"
@@ -1,13 +1,22 @@
 import logging
+import os
 import sys
-from rich.logging import RichHandler
 
 def setup_logger(name: str = "agentnexus") -> logging.Logger:
+    # Rich output is for local development; production gets a plain stream handler
+    # (RichHandler parses markup and renders every record, even at INFO volume).
+    if os.getenv("LOG_PRETTY", "").lower() in ("1", "true", "yes"):
+        from rich.logging import RichHandler
+        handler = RichHandler(rich_tracebacks=True)
+        fmt = "%(message)s"
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+        fmt = "%(asctime)s %(levelname)s %(name)s: %(message)s"
     logging.basicConfig(
-        level="INFO",
-        format="%(message)s",
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format=fmt,
         datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True)]
+        handlers=[handler]
     )
     logger = logging.getLogger(name)
     return logger
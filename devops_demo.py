@@ -45,5 +45,7 @@ async def main():
     result_turn2 = await engine.run(request, session_id=session_id)
     print(f"\nRemediation Results:\n{result_turn2}\n")
 
+    await engine.drain()
+
 if __name__ == "__main__":
     asyncio.run(main())
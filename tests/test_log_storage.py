@@ -0,0 +1,56 @@
+"""
+LogStorage sync shims: writes must be committed when the shim returns,
+since the background loop that runs them is never shut down.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:
+    aiosqlite = None
+
+if aiosqlite is not None:
+    from devops_copilot.core.log_storage import LogStorage
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite not installed")
+class SyncShimTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "logs.db")
+        self.store = LogStorage(db_path=self.db_path)
+
+    def tearDown(self):
+        self.store.close_sync()
+        self._tmp.cleanup()
+
+    def _count(self, table: str) -> int:
+        # A separate connection sees only committed rows
+        with sqlite3.connect(self.db_path) as db:
+            return db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_ingest_log_sync_commits_before_returning(self):
+        for i in range(20):
+            self.store.ingest_log_sync("checkout", "ERROR" if i % 2 else "INFO", f"m{i}")
+        self.assertEqual(self._count("logs"), 20)
+        self.assertEqual(self._count("spike_tracker"), 1)
+
+    def test_reads_see_shim_writes(self):
+        self.store.ingest_log_sync("checkout", "ERROR", "boom")
+        errors, total, spike_start = self.store.get_window_stats_sync("checkout")
+        self.assertEqual((errors, total), (1, 1))
+        self.assertIsNotNone(spike_start)
+
+    def test_flush_sync_and_close_sync(self):
+        self.store.ingest_logs_sync([{"service": "auth", "level": "INFO", "message": "ok"}])
+        self.store.flush_sync()
+        self.store.close_sync()
+        self.assertEqual(self._count("logs"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Ordering and visibility of PersistenceLayer's batched save_session writer.
+A second PersistenceLayer on the same file stands in for the API process.
+"""
+import os
+import tempfile
+import unittest
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:
+    aiosqlite = None
+
+if aiosqlite is not None:
+    from devops_copilot.core.persistence import PersistenceLayer
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite not installed")
+class BatchedSaveTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmp.name, "state.db")
+        self.engine = PersistenceLayer(db_path=db_path)
+        self.api = PersistenceLayer(db_path=db_path)
+        await self.engine.setup()
+        await self.api.setup()
+
+    async def asyncTearDown(self):
+        await self.engine.close()
+        await self.api.close()
+        self._tmp.cleanup()
+
+    def _state(self, n_history: int, **metadata):
+        return {
+            "session_id": "s1",
+            "history": [{"role": "user", "content": str(i)} for i in range(n_history)],
+            "metadata": metadata,
+        }
+
+    async def test_queued_save_visible_locally_before_flush(self):
+        self.engine.FLUSH_INTERVAL = 60  # keep the timer out of the way
+        await self.engine.save_session("s1", self._state(1))
+        self.assertEqual(len((await self.engine.load_session("s1"))["history"]), 1)
+        self.assertIsNone(await self.api.load_session("s1"))
+
+    async def test_flush_commits_for_other_connections(self):
+        await self.engine.save_session("s1", self._state(1))
+        await self.engine.flush()
+        self.assertIsNotNone(await self.api.load_session("s1"))
+
+    async def test_newest_save_wins(self):
+        await self.engine.save_session("s1", self._state(1))
+        await self.engine.save_session("s1", self._state(3))
+        await self.engine.flush()
+        self.assertEqual(len((await self.api.load_session("s1"))["history"]), 3)
+
+    async def test_append_history_applies_after_queued_save(self):
+        await self.engine.save_session("s1", self._state(2))
+        ok = await self.engine.append_history("s1", [{"role": "assistant", "content": "x"}])
+        self.assertTrue(ok)
+        stored = await self.api.load_session("s1")
+        self.assertEqual([h["content"] for h in stored["history"]], ["0", "1", "x"])
+
+    async def test_delta_save_stores_same_metadata_as_full_save(self):
+        await self.engine.save_session("s1", self._state(1, keep={"a": 1, "b": 2}, drop=True))
+        metadata = {"keep": {"a": 1}, "none": None}
+        ok = await self.engine.append_history("s1", [{"role": "assistant", "content": "x"}],
+                                              metadata=metadata)
+        self.assertTrue(ok)
+        self.assertEqual((await self.api.load_session("s1"))["metadata"], metadata)
+
+    async def test_approval_after_flush_is_not_overwritten(self):
+        # Engine hits the approval gate: save, flush, return PENDING_APPROVAL
+        await self.engine.save_session("s1", self._state(1, human_approved=False))
+        await self.engine.flush()
+        # API approves from its own connection
+        await self.api.set_approved("s1")
+        # Nothing left queued on the engine side to clobber the approval
+        await self.engine.flush()
+        stored = await self.engine.load_session("s1")
+        self.assertIs(stored["metadata"]["human_approved"], True)
+
+    async def test_set_rejected_keeps_newer_history(self):
+        await self.engine.save_session("s1", self._state(1, human_approved=True))
+        await self.engine.flush()
+        await self.engine.append_history("s1", [{"role": "assistant", "content": "x"}])
+        await self.api.set_rejected("s1")
+        stored = await self.engine.load_session("s1")
+        self.assertEqual(len(stored["history"]), 2)
+        self.assertEqual(stored["metadata"], {"human_approved": False, "rejected": True})
+
+    async def test_set_approved_unknown_session(self):
+        with self.assertRaises(KeyError):
+            await self.api.set_approved("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()